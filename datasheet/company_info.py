@@ -1,10 +1,7 @@
-from reportlab.platypus import Paragraph, Spacer
-from styles import create_heading_style
+from content_model import Section, Spacer, Text
 
 
-def add_company_info(story, normal_style):
-    story.append(Paragraph('Our Mission', create_heading_style()))
-    story.append(Spacer(1, 8))
+def company_info_section():
     mission_content = (
         "At Gearotons, we believe that the future belongs to those who understand and can work alongside artificial "
         "intelligence and automation systems. Our mission is to empower the next generation of innovators by making "
@@ -19,5 +16,4 @@ def add_company_info(story, normal_style):
         "partnerships and open-source approach, we're fostering a generation that doesn't just use technology, but truly "
         "understands and shapes it. Together, we're building the foundation for innovators who will define the future."
     )
-    story.append(Paragraph(mission_content, normal_style))
-    story.append(Spacer(1, 15))
+    return Section('Our Mission', [Spacer(8), Text(mission_content), Spacer(15)])
@@ -0,0 +1,75 @@
+"""Backend-neutral description of the datasheet.
+
+Section builders produce these objects once; pdf_backend turns them into a
+ReportLab story and html_backend into a product web page. In streaming mode
+``Document.sections`` is a generator that is consumed exactly once.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Union
+
+# Paragraph styles understood by both backends.
+TEXT_STYLES = ('title', 'slogan', 'body', 'feature', 'footer')
+
+
+@dataclass
+class Text:
+    text: str
+    style: str = 'body'
+
+
+@dataclass
+class Spacer:
+    height: float
+
+
+@dataclass
+class ImageBlock:
+    path: Path
+    width: float  # points on the page; the HTML page uses the same image derivative
+
+
+@dataclass
+class ImageRow:
+    images: List[ImageBlock]
+    column_width: Optional[float] = None  # None: each column is its image width plus padding
+
+
+@dataclass
+class TableBlock:
+    rows: List[List[str]]  # first row is the header
+    col_fractions: Sequence[float]
+
+
+@dataclass
+class LinkBlock:
+    text: str
+    url: str
+    icon: Path
+    width: float
+
+
+@dataclass
+class PdfPageBlock:
+    path: Path
+    width: float
+
+
+Block = Union[Text, Spacer, ImageBlock, ImageRow, TableBlock, LinkBlock, PdfPageBlock]
+
+
+@dataclass
+class Section:
+    title: Optional[str]
+    blocks: List[Block] = field(default_factory=list)
+    page_break_before: bool = False
+    keep_together: bool = False  # keep the heading and all blocks on one page
+    hero: bool = False  # on the web pages, shown above each product version's header
+
+
+@dataclass
+class Document:
+    title: str
+    sections: Iterable[Section] = field(default_factory=list)
@@ -1,24 +1,30 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import argparse
 import shutil
+import sys
 from datetime import datetime
-from pathlib import Path
+from typing import Iterator, List, Optional
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
-from reportlab.platypus import (Frame, Image, PageTemplate, Paragraph,
-                                SimpleDocTemplate, Spacer, Table)
+from reportlab.platypus import Frame, PageTemplate, SimpleDocTemplate
 
-from company_info import add_company_info
-from content import add_all_content
-from open_source import add_open_source_section
-from specs import add_all_specs
-from styles import (create_footer_style, create_normal_style,
-                    create_slogan_style, create_title_style)
-from utils import (ASSET_ROOT, get_adapter_photo_paths, get_image_size,
-                   get_processed_image)
-from versioning import add_version_info, get_latest_version_info
+from company_info import company_info_section
+from content import all_content_sections
+from content_model import Document, ImageBlock, ImageRow, Section, Spacer, Text
+from html_backend import RenderedSection, tee_sections, write_product_pages, write_rendered_pages
+from image_derivatives import ImageDerivatives
+from open_source import open_source_section
+from pdf_backend import BatchedDocTemplate, render_story, stream_story
+from specs import all_spec_sections
+from utils import ASSET_ROOT, fatal, get_adapter_photo_paths, get_image_size, load_product_data
+from versioning import get_latest_version_info, version_info_section
+
+DOCUMENT_TITLE = 'RS485 Adapter – DATASHEET'
+PAGE_MARGIN = 18 * mm
+CONTENT_WIDTH = A4[0] - 2 * PAGE_MARGIN
 
 
 def first_page(canvas, doc):
@@ -39,25 +45,28 @@ def later_pages(canvas, doc):
     canvas.drawRightString(page_width - 15 * mm, 8 * mm, str(doc.page))
 
 
-def _build_hero_section(content_width: float):
-    slogan_style = create_slogan_style()
-    elements = [
-        Paragraph('Affordable and Simple All-in-One Motion Control', slogan_style),
-        Paragraph('From Education to Innovation', slogan_style),
-        Spacer(1, 8),
-    ]
+def _build_title_section(content_width: float) -> Section:
+    blocks = [Text(DOCUMENT_TITLE, 'title'), Spacer(6)]
+
+    logo_path = ASSET_ROOT / 'Gearotons_Logo.png'
+    if logo_path.exists():
+        blocks.extend([ImageBlock(logo_path, 90), Spacer(6)])
+
+    blocks.extend([
+        Text('Affordable and Simple All-in-One Motion Control', 'slogan'),
+        Text('From Education to Innovation', 'slogan'),
+        Spacer(8),
+    ])
 
     photo_paths = get_adapter_photo_paths()
     photo_count = len(photo_paths)
     if photo_count:
         column_width = max((content_width - (photo_count - 1) * 6) / photo_count, 10)
-        photos = [get_processed_image(path, column_width) for path in photo_paths]
-        photo_table = Table([photos], colWidths=[column_width] * photo_count)
-        photo_table.hAlign = 'CENTER'
-        elements.append(photo_table)
-        elements.append(Spacer(1, 4))
+        photos = [ImageBlock(path, column_width) for path in photo_paths]
+        blocks.extend([ImageRow(photos, column_width), Spacer(4)])
 
-    return elements
+    blocks.append(Spacer(10))
+    return Section(None, blocks, hero=True)
 
 
 def _output_filenames(version: str, release_date: str):
@@ -67,44 +76,43 @@ def _output_filenames(version: str, release_date: str):
     return dated, latest
 
 
-def build_story(content_width: float):
-    story = []
-    title_style = create_title_style()
-    normal_style = create_normal_style()
+def _iter_sections(content_width: float) -> Iterator[Section]:
+    yield _build_title_section(content_width)
+    yield from all_content_sections()
+    yield from all_spec_sections()
+    yield company_info_section()
+    yield open_source_section()
+    yield version_info_section()
+    yield Section(None, [Spacer(12), Text('© {} Gearotons'.format(datetime.now().year), 'footer')])
 
-    story.append(Paragraph('RS485 Adapter – DATASHEET', title_style))
-    story.append(Spacer(1, 6))
-
-    logo_path = ASSET_ROOT / 'Gearotons_Logo.png'
-    if logo_path.exists():
-        logo = get_processed_image(logo_path, 90)
-        story.append(logo)
-        story.append(Spacer(1, 6))
 
-    story.extend(_build_hero_section(content_width))
-    story.append(Spacer(1, 10))
+def build_document(content_width: float, streaming: bool = False) -> Document:
+    """Read every source (text files, spec tables, images) once for all output formats.
 
-    add_all_content(story, normal_style)
-    add_all_specs(story, normal_style)
-    add_company_info(story, normal_style)
-    add_open_source_section(story, normal_style)
-    add_version_info(story, normal_style)
+    A streaming document builds each section only when the PDF layout reaches it
+    and can therefore be consumed only once.
+    """
+    sections = _iter_sections(content_width)
+    return Document(DOCUMENT_TITLE, sections if streaming else list(sections))
 
-    footer_style = create_footer_style()
-    story.append(Spacer(1, 12))
-    story.append(Paragraph('© {} Gearotons'.format(datetime.now().year), footer_style))
-    return story
 
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process, or None where the platform does not report it."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
 
-def generate_pdf():
-    version, release_date = get_latest_version_info()
-    dated_filename, latest_filename = _output_filenames(version, release_date)
 
-    doc = SimpleDocTemplate(
-        dated_filename,
+def _create_doc_template(filename: str, streaming: bool = False) -> SimpleDocTemplate:
+    doc = (BatchedDocTemplate if streaming else SimpleDocTemplate)(
+        filename,
         pagesize=A4,
-        rightMargin=18 * mm,
-        leftMargin=18 * mm,
+        rightMargin=PAGE_MARGIN,
+        leftMargin=PAGE_MARGIN,
         topMargin=6 * mm,
         bottomMargin=10 * mm
     )
@@ -114,13 +122,61 @@ def generate_pdf():
         PageTemplate(id='First', frames=frame, onPage=first_page),
         PageTemplate(id='Later', frames=frame, onPage=later_pages),
     ])
+    return doc
+
 
-    story = build_story(doc.width)
+def generate_pdf(document: Document, images: ImageDerivatives, streaming: bool = False):
+    version, release_date = get_latest_version_info()
+    dated_filename, latest_filename = _output_filenames(version, release_date)
+    doc = _create_doc_template(dated_filename, streaming)
+    story = stream_story(document, doc.width, images) if streaming else render_story(document, doc.width, images)
     doc.build(story)
     shutil.copyfile(dated_filename, latest_filename)
     print(f"Generated datasheet: {dated_filename}")
     print(f"Copied latest alias: {latest_filename}")
 
 
+def generate_web_pages(document: Document, images: ImageDerivatives, rendered: Optional[List[RenderedSection]] = None):
+    if rendered is None:
+        pages = write_product_pages(document, load_product_data(), images)
+    else:
+        pages = write_rendered_pages(document.title, rendered, load_product_data(), images)
+    for page in pages:
+        print(f"Generated product page: {page}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate the RS485 adapter datasheet PDF and product web pages.')
+    parser.add_argument('--no-pdf', action='store_true', help='skip the PDF datasheet')
+    parser.add_argument('--no-html', action='store_true', help='skip the HTML product pages')
+    parser.add_argument('--stream', action='store_true',
+                        help='build sections while laying out the PDF, release images once drawn and write pages in batches')
+    parser.add_argument('--max-rss-mb', type=float, default=None,
+                        help='fail if the peak resident memory of the run exceeds this many MB')
+    args = parser.parse_args()
+
+    streaming = args.stream and not args.no_pdf
+    document = build_document(CONTENT_WIDTH, streaming)
+    images = ImageDerivatives()
+    rendered = None
+    if streaming and not args.no_html:
+        rendered = []
+        document.sections = tee_sections(document.sections, rendered, images)
+    if not args.no_pdf:
+        generate_pdf(document, images, streaming)
+    if not args.no_html:
+        generate_web_pages(document, images, rendered)
+    print(f"Image derivatives written this run: {images.generated}")
+
+    peak_mb = peak_rss_mb()
+    if peak_mb is None:
+        if args.max_rss_mb is not None:
+            print('WARNING: peak resident memory is not available on this platform; --max-rss-mb is ignored')
+        return
+    print(f"Peak resident memory: {peak_mb:.1f} MB")
+    if args.max_rss_mb is not None and peak_mb > args.max_rss_mb:
+        fatal(f"Peak resident memory {peak_mb:.1f} MB exceeds the {args.max_rss_mb:.1f} MB ceiling")
+
+
 if __name__ == '__main__':
-    generate_pdf()
+    main()
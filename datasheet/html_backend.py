@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import html
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from string import Template
+from typing import Iterable, Iterator, List, Optional
+
+from content_model import (Document, ImageBlock, ImageRow, LinkBlock, PdfPageBlock, Section, Spacer, TableBlock,
+                           Text)
+from image_derivatives import ImageDerivatives
+from utils import PROJECT_DIR
+
+WEB_DIR = PROJECT_DIR / 'build' / 'web'
+ICON_SIZE = 24
+PRODUCT_LINKS = (
+    ('schematic', 'Schematic'),
+    ('user_manual', 'User manual'),
+    ('tutorial', 'Tutorial'),
+    ('github', 'Design files on GitHub'),
+)
+
+DEFAULT_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>$title</title>
+<style>
+body { font-family: Helvetica, Arial, sans-serif; color: #222222; max-width: 820px; margin: 0 auto; padding: 24px; line-height: 1.4; }
+h1 { color: #003049; text-align: center; }
+h2 { color: #003049; margin-top: 1.6em; }
+.slogan { color: #34a853; font-size: 1.3em; font-weight: bold; text-align: center; margin: 0.2em 0; }
+.image-row { display: flex; justify-content: center; gap: 8px; flex-wrap: wrap; }
+img { max-width: 100%; height: auto; }
+figure { text-align: center; margin: 1em 0; }
+table { border-collapse: collapse; width: 100%; }
+th { background: #003049; color: #f5f5f5; text-align: left; }
+th, td { border: 1px solid #808080; padding: 6px; }
+.icon-link { text-align: center; font-size: 1.1em; }
+.icon-link a { color: #34a853; text-decoration: none; }
+.icon-link img { vertical-align: middle; margin-right: 6px; }
+footer { color: #808080; text-align: center; font-size: 0.9em; }
+</style>
+</head>
+<body>
+$content
+</body>
+</html>
+""")
+
+
+@dataclass
+class RenderedSection:
+    markup: str
+    hero: bool = False
+
+
+class HtmlRenderer:
+    """Renders sections as HTML fragments for pages published from ``output_dir``.
+
+    Every image a page uses is copied next to it, so the directory can be published on
+    its own. Embedded PDF pages are left out: the schematic belongs to one product
+    version, and each version's header links its own.
+    """
+
+    def __init__(self, images: ImageDerivatives, output_dir: Path):
+        self.images = images
+        self.output_dir = output_dir
+
+    def _href(self, path: Path) -> str:
+        relative = Path('images') / self.images.relative_path(path)
+        target = self.output_dir / relative
+        if not target.exists() or target.stat().st_mtime < path.stat().st_mtime:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(path, target)
+        return relative.as_posix()
+
+    def image(self, block: ImageBlock) -> str:
+        width, height = self.images.display_size(block.path, block.width)
+        src = self._href(self.images.get(block.path, block.width))
+        alt = html.escape(Path(block.path).stem.replace('_', ' '))
+        return f'<img src="{html.escape(src)}" width="{round(width)}" height="{round(height)}" alt="{alt}">'
+
+    def text(self, block: Text) -> str:
+        if block.style == 'title':
+            return f'<h1>{html.escape(block.text)}</h1>'
+        if block.style == 'slogan':
+            return f'<p class="slogan">{html.escape(block.text)}</p>'
+        if block.style == 'feature':
+            return f'<li>{html.escape(block.text)}</li>'
+        if block.style == 'footer':
+            return f'<footer>{html.escape(block.text)}</footer>'
+        paragraphs = [part.strip() for part in block.text.split('\n\n') if part.strip()]
+        return '\n'.join(f'<p>{html.escape(part)}</p>' for part in paragraphs)
+
+    def table(self, block: TableBlock) -> str:
+        header = ''.join(f'<th>{html.escape(cell)}</th>' for cell in block.rows[0])
+        rows = [
+            '<tr>' + ''.join(f'<td>{html.escape(cell)}</td>' for cell in row) + '</tr>'
+            for row in block.rows[1:]
+        ]
+        return f'<table>\n<thead><tr>{header}</tr></thead>\n<tbody>\n' + '\n'.join(rows) + '\n</tbody>\n</table>'
+
+    def link(self, block: LinkBlock) -> str:
+        icon = self._href(self.images.get(block.icon, ICON_SIZE))
+        return (
+            f'<p class="icon-link"><a href="{html.escape(block.url)}">'
+            f'<img src="{html.escape(icon)}" width="{ICON_SIZE}" height="{ICON_SIZE}" alt="">'
+            f'{html.escape(block.text)}</a></p>'
+        )
+
+    def block(self, block) -> str:
+        if isinstance(block, Text):
+            return self.text(block)
+        if isinstance(block, Spacer):
+            return ''
+        if isinstance(block, ImageBlock):
+            return f'<figure>{self.image(block)}</figure>'
+        if isinstance(block, ImageRow):
+            return '<div class="image-row">' + ''.join(self.image(item) for item in block.images) + '</div>'
+        if isinstance(block, TableBlock):
+            return self.table(block)
+        if isinstance(block, LinkBlock):
+            return self.link(block)
+        if isinstance(block, PdfPageBlock):
+            return ''
+        raise TypeError(f"Unsupported content block: {block!r}")
+
+    def section(self, section: Section) -> str:
+        """HTML for ``section``, or '' when none of its blocks appear on the web page."""
+        parts = []
+        in_list = False
+        for block in section.blocks:
+            is_feature = isinstance(block, Text) and block.style == 'feature'
+            if is_feature != in_list:
+                parts.append('<ul>' if is_feature else '</ul>')
+                in_list = is_feature
+            rendered = self.block(block)
+            if rendered:
+                parts.append(rendered)
+        if in_list:
+            parts.append('</ul>')
+        if not parts:
+            return ''
+        if section.title:
+            parts.insert(0, f'<h2>{html.escape(section.title)}</h2>')
+        return '<section>\n' + '\n'.join(parts) + '\n</section>'
+
+    def product_header(self, product: str, version: dict) -> str:
+        parts = [f'<h2>{html.escape(product)} – version {html.escape(str(version["version"]))}</h2>']
+        if version.get('description'):
+            parts.append(f'<p>{html.escape(version["description"])}</p>')
+        pictures = version.get('picture') or []
+        if isinstance(pictures, str):
+            pictures = [pictures]
+        if pictures:
+            parts.append('<div class="image-row">' + ''.join(
+                f'<img src="{html.escape(url)}" width="260" alt="{html.escape(product)}">' for url in pictures
+            ) + '</div>')
+        links = [
+            f'<li><a href="{html.escape(version[key])}">{label}</a></li>'
+            for key, label in PRODUCT_LINKS if version.get(key)
+        ]
+        if links:
+            parts.append('<ul>\n' + '\n'.join(links) + '\n</ul>')
+        return '<section>\n' + '\n'.join(parts) + '\n</section>'
+
+
+def render_section(renderer: HtmlRenderer, section: Section) -> Optional[RenderedSection]:
+    markup = renderer.section(section)
+    return RenderedSection(markup, section.hero) if markup else None
+
+
+def tee_sections(sections: Iterable[Section], rendered: List[RenderedSection], images: ImageDerivatives,
+                 output_dir: Path = WEB_DIR) -> Iterator[Section]:
+    """Pass sections through unchanged, appending the HTML of each to ``rendered``.
+
+    Lets a streamed document feed the PDF and the web pages in a single pass:
+    only the rendered markup is kept, not the sections themselves.
+    """
+    renderer = HtmlRenderer(images, output_dir)
+    for section in sections:
+        result = render_section(renderer, section)
+        if result:
+            rendered.append(result)
+        yield section
+
+
+def write_rendered_pages(title: str, sections: List[RenderedSection], products: List[dict], images: ImageDerivatives,
+                         output_dir: Path = WEB_DIR, template: Optional[Template] = None) -> List[Path]:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    renderer = HtmlRenderer(images, output_dir)
+    hero = [section.markup for section in sections if section.hero]
+    body = '\n'.join(section.markup for section in sections if not section.hero)
+    template = template or DEFAULT_TEMPLATE
+    written = []
+    for product in products:
+        for version in product.get('versions', []):
+            page_title = f"{product['product']} {version['version']} – {title}"
+            content = '\n'.join(hero + [renderer.product_header(product['product'], version), body])
+            path = output_dir / f"{product['product']}_{version['version']}.html"
+            path.write_text(template.safe_substitute(title=html.escape(page_title), content=content), encoding='utf-8')
+            written.append(path)
+    return written
+
+
+def write_product_pages(document: Document, products: List[dict], images: ImageDerivatives,
+                        output_dir: Path = WEB_DIR, template: Optional[Template] = None) -> List[Path]:
+    """Write one page per product version; the shared datasheet body is rendered only once."""
+    renderer = HtmlRenderer(images, output_dir)
+    sections = [result for result in (render_section(renderer, section) for section in document.sections) if result]
+    return write_rendered_pages(document.title, sections, products, images, output_dir, template)
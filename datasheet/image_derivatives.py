@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import math
+from pathlib import Path
+from typing import Dict, Tuple
+
+from PIL import Image as PILImage
+
+from utils import PROJECT_DIR
+
+SOURCE_ROOT = PROJECT_DIR.parent
+DERIVATIVE_DIR = PROJECT_DIR / 'build' / 'images'
+DEFAULT_DPI = 200
+JPEG_QUALITY = 88
+
+
+class ImageDerivatives:
+    """Resized copies of source images, shared by the PDF and HTML backends.
+
+    Each (image, pixel width) pair is produced at most once per run, and files
+    left by an earlier run are reused while they are newer than their source.
+    Images that are already small enough are used as they are. Derivatives mirror
+    the source tree below ``output_dir``, so images that share a file name in
+    different directories never overwrite each other.
+    """
+
+    def __init__(self, output_dir: Path = DERIVATIVE_DIR, dpi: int = DEFAULT_DPI):
+        self.output_dir = output_dir
+        self.dpi = dpi
+        self._paths: Dict[Tuple[Path, int], Path] = {}
+        self._sizes: Dict[Path, Tuple[int, int]] = {}
+        self.generated = 0
+
+    def source_size(self, source: Path) -> Tuple[int, int]:
+        source = Path(source)
+        if source not in self._sizes:
+            with PILImage.open(source) as img:
+                self._sizes[source] = img.size
+        return self._sizes[source]
+
+    def display_size(self, source: Path, width: float) -> Tuple[float, float]:
+        pixel_width, pixel_height = self.source_size(source)
+        return width, pixel_height * width / float(pixel_width)
+
+    def relative_path(self, path: Path) -> Path:
+        """Where a source image or one of its derivatives sits relative to the source root."""
+        path = Path(path).absolute()
+        for root in (self.output_dir.absolute(), SOURCE_ROOT):
+            try:
+                return path.relative_to(root)
+            except ValueError:
+                pass
+        return Path(*path.parts[1:])
+
+    def get(self, source: Path, width: float) -> Path:
+        source = Path(source)
+        pixel_width = math.ceil(width / 72.0 * self.dpi)
+        key = (source, pixel_width)
+        if key not in self._paths:
+            self._paths[key] = self._derive(source, pixel_width)
+        return self._paths[key]
+
+    def _derive(self, source: Path, pixel_width: int) -> Path:
+        original_width, original_height = self.source_size(source)
+        if original_width <= pixel_width:
+            return source
+        target = self.output_dir / self.relative_path(source).with_name(
+            f"{source.stem}_{pixel_width}w{source.suffix.lower()}")
+        if target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
+            return target
+        target.parent.mkdir(parents=True, exist_ok=True)
+        pixel_height = max(1, round(original_height * pixel_width / original_width))
+        with PILImage.open(source) as img:
+            resized = img.resize((pixel_width, pixel_height), PILImage.LANCZOS)
+            if target.suffix in ('.jpg', '.jpeg'):
+                resized.convert('RGB').save(target, quality=JPEG_QUALITY, optimize=True)
+            else:
+                resized.save(target, optimize=True)
+        self.generated += 1
+        return target
@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import shutil
+import tempfile
+import weakref
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Sequence
+
+from pypdf import PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Flowable, Image, KeepTogether, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table
+
+from content_model import (Document, ImageBlock, ImageRow, LinkBlock, PdfPageBlock, Section, Spacer as SpacerBlock,
+                           TableBlock, Text)
+from image_derivatives import ImageDerivatives
+from styles import (create_feature_style, create_footer_style, create_heading_style, create_normal_style,
+                    create_slogan_style, create_table_style, create_title_style)
+from utils import PDFPageFlowable
+
+IMAGE_ROW_PADDING = 10
+ICON_SIZE = 24
+STREAM_LOOKAHEAD = 8
+STREAM_BATCH_PAGES = 32
+
+
+class IconLink(Flowable):
+    LINK_COLOR = (
+        52 / 255,
+        168 / 255,
+        83 / 255,
+    )
+
+    def __init__(self, icon_path: str, text: str, url: str, width: float):
+        super().__init__()
+        self.icon_path = icon_path
+        self.text = text
+        self.url = url
+        self.width = width
+        self.height = 32
+
+    def wrap(self, *args):
+        return self.width, self.height
+
+    def draw(self):
+        icon_size = ICON_SIZE
+        text_x = (self.width - icon_size) / 2 + icon_size + 6
+
+        self.canv.drawImage(self.icon_path, (self.width - icon_size) / 2 - 6, 4, icon_size, icon_size, mask='auto')
+
+        self.canv.setFont('Helvetica', 13)
+        self.canv.setFillColorRGB(*self.LINK_COLOR)
+        text_width = self.canv.stringWidth(self.text, 'Helvetica', 13)
+        self.canv.drawString(text_x, 10, self.text)
+
+        self.canv.linkURL(self.url, (text_x, 4, text_x + text_width, 24), relative=1)
+
+
+class StreamingStory:
+    """List-like view of a flowable generator for ``doc.build``.
+
+    ReportLab only touches the front of the story: it reads and deletes the first
+    flowables, pushes split remainders back, and looks ahead for keepWithNext
+    chains. Only that window is held in memory; everything behind it is released
+    once drawn and everything ahead of it is not built yet. The window holds at
+    least ``lookahead`` flowables and always reaches past the end of a
+    keepWithNext chain that starts in it, however long the chain is.
+    """
+
+    def __init__(self, flowables: Iterable[Flowable], lookahead: int = STREAM_LOOKAHEAD):
+        self._source = iter(flowables)
+        self._buffer: List[Flowable] = []
+        self._lookahead = lookahead
+
+    def _fill(self, count: int) -> None:
+        while len(self._buffer) < count:
+            try:
+                self._buffer.append(next(self._source))
+            except StopIteration:
+                return
+
+    def __len__(self) -> int:
+        self._fill(self._lookahead)
+        count = len(self._buffer)
+        while count and self._buffer[count - 1].getKeepWithNext():
+            self._fill(count + 1)
+            if len(self._buffer) == count:
+                break
+            count = len(self._buffer)
+        return count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            self._fill(index.stop if index.stop is not None else self._lookahead)
+        elif index >= 0:
+            self._fill(index + 1)
+        return self._buffer[index]
+
+    def __setitem__(self, index, value):
+        self._buffer[index] = value
+
+    def __delitem__(self, index):
+        del self._buffer[index]
+
+    def insert(self, index: int, value: Flowable) -> None:
+        self._buffer.insert(index, value)
+
+
+class BatchedDocTemplate(SimpleDocTemplate):
+    """Lays the story out into temporary PDFs of ``batch_pages`` pages and joins them.
+
+    A ReportLab canvas keeps every finished page, with its images and embedded
+    pages, until it is saved. Saving the canvas every ``batch_pages`` pages and
+    starting a new one keeps a single batch in memory; page numbers and page
+    templates carry on across batches because the template state does. An image
+    or embedded page used in several batches is stored once per batch.
+    """
+
+    def __init__(self, filename: str, batch_pages: int = STREAM_BATCH_PAGES, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.batch_pages = batch_pages
+        self._parts: List[Path] = []
+        self._part_dir = None
+
+    def _makeCanvas(self, filename=None, canvasmaker=Canvas):
+        self._canvasmaker = canvasmaker
+        self._parts.append(Path(self._part_dir) / f'part{len(self._parts):05d}.pdf')
+        return super()._makeCanvas(str(self._parts[-1]), canvasmaker)
+
+    def handle_pageBegin(self):
+        if self.page and self.page % self.batch_pages == 0:
+            self.canv.save()
+            self.canv = self._makeCanvas(canvasmaker=self._canvasmaker)
+            self.canv._doctemplate = self
+        super().handle_pageBegin()
+
+    def build(self, flowables, *args, **kwargs):
+        with tempfile.TemporaryDirectory() as part_dir:
+            self._part_dir, self._parts = part_dir, []
+            super().build(flowables, *args, **kwargs)
+            if len(self._parts) == 1:
+                shutil.move(str(self._parts[0]), self.filename)
+            else:
+                concatenate_pdfs(self._parts, self.filename)
+
+
+class _ObjectWriter:
+    """Writes indirect objects to a PDF file as they are numbered, recording their offsets."""
+
+    def __init__(self, output: BinaryIO):
+        self.output = output
+        self.offsets: List[int] = []
+
+    def reserve(self) -> IndirectObject:
+        self.offsets.append(0)
+        return IndirectObject(len(self.offsets), 0, None)
+
+    def write(self, reference: IndirectObject, obj) -> None:
+        self.offsets[reference.idnum - 1] = self.output.tell()
+        self.output.write(f'{reference.idnum} 0 obj\n'.encode())
+        obj.write_to_stream(self.output)
+        self.output.write(b'\nendobj\n')
+
+    def finish(self, root: IndirectObject, info: IndirectObject) -> None:
+        xref = self.output.tell()
+        self.output.write(f'xref\n0 {len(self.offsets) + 1}\n0000000000 65535 f \n'.encode())
+        self.output.write(b''.join(f'{offset:010d} 00000 n \n'.encode() for offset in self.offsets))
+        self.output.write(f'trailer\n<< /Size {len(self.offsets) + 1} /Root {root.idnum} 0 R '
+                          f'/Info {info.idnum} 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode())
+
+
+def _copy_part(reader: PdfReader, objects: _ObjectWriter, pages: IndirectObject) -> List[IndirectObject]:
+    """Copy the pages of ``reader`` and everything they reference; returns the new page references."""
+    numbers: Dict[int, IndirectObject] = {}
+    pending = []
+    renumbered = set()  # containers are renumbered in place, and may be reached twice
+
+    def renumber(obj):
+        if isinstance(obj, IndirectObject):
+            if obj.idnum not in numbers:
+                numbers[obj.idnum] = objects.reserve()
+                pending.append(obj)
+            return numbers[obj.idnum]
+        if id(obj) in renumbered:
+            return obj
+        renumbered.add(id(obj))
+        if isinstance(obj, DictionaryObject):
+            for key, value in list(obj.items()):
+                obj[key] = renumber(value)
+        elif isinstance(obj, ArrayObject):
+            obj[:] = [renumber(value) for value in obj]
+        return obj
+
+    kids = []
+    for page in reader.pages:
+        kids.append(objects.reserve())
+        numbers[page.indirect_reference.idnum] = kids[-1]
+    for page, reference in zip(reader.pages, kids):
+        del page['/Parent']
+        renumber(page)[NameObject('/Parent')] = pages
+        objects.write(reference, page)
+    while pending:
+        original = pending.pop()
+        objects.write(numbers[original.idnum], renumber(original.get_object()))
+    return kids
+
+
+def concatenate_pdfs(parts: Sequence[Path], filename: str) -> None:
+    """Join the pages of ``parts`` into one PDF, keeping the document information of the first.
+
+    Each part's objects are renumbered and written straight to ``filename``, so only
+    one part is held in memory at a time. Outlines and links between parts are not kept.
+    """
+    with open(filename, 'wb') as output:
+        output.write(b'%PDF-1.4\n%\x93\x8c\x8b\x9e\n')
+        objects = _ObjectWriter(output)
+        pages, root = objects.reserve(), objects.reserve()
+        info = objects.reserve()
+        kids = []
+        for index, part in enumerate(parts):
+            reader = PdfReader(part)
+            if index == 0:
+                # ReportLab writes the document information as plain strings.
+                objects.write(info, DictionaryObject(reader.trailer['/Info'].get_object()))
+            kids.extend(_copy_part(reader, objects, pages))
+        objects.write(pages, DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): ArrayObject(kids),
+            NameObject('/Count'): NumberObject(len(kids)),
+        }))
+        objects.write(root, DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): pages,
+        }))
+        objects.finish(root, info)
+
+
+class PdfRenderer:
+    def __init__(self, images: ImageDerivatives, lazy: bool = False):
+        self.images = images
+        self.lazy = lazy
+        # Pages embedded from PDF files, by canvas, so each is embedded once per output file.
+        self.pdf_forms = weakref.WeakKeyDictionary()
+        self.styles = {
+            'title': create_title_style(),
+            'slogan': create_slogan_style(),
+            'body': create_normal_style(),
+            'feature': create_feature_style(),
+            'footer': create_footer_style(),
+        }
+        self.heading_style = create_heading_style()
+
+    def image(self, block: ImageBlock) -> Image:
+        width, height = self.images.display_size(block.path, block.width)
+        # lazy=2 reads the pixels only while drawing and drops them straight after.
+        img = Image(str(self.images.get(block.path, block.width)), width=width, height=height,
+                    lazy=2 if self.lazy else 1)
+        img.hAlign = 'CENTER'
+        return img
+
+    def image_row(self, block: ImageRow) -> Table:
+        images = [self.image(item) for item in block.images]
+        if block.column_width is not None:
+            widths = [block.column_width] * len(images)
+        else:
+            widths = [img.drawWidth + IMAGE_ROW_PADDING for img in images]
+        table = Table([images], colWidths=widths)
+        table.hAlign = 'CENTER'
+        return table
+
+    def table(self, block: TableBlock, content_width: float) -> Table:
+        body = self.styles['body']
+        data = [block.rows[0]] + [
+            [row[0]] + [Paragraph(cell, body) for cell in row[1:]]
+            for row in block.rows[1:]
+        ]
+        table = Table(data, colWidths=[content_width * fraction for fraction in block.col_fractions], hAlign='LEFT')
+        table.setStyle(create_table_style())
+        return table
+
+    def block(self, block, content_width: float) -> Flowable:
+        if isinstance(block, Text):
+            return Paragraph(block.text, self.styles[block.style])
+        if isinstance(block, SpacerBlock):
+            return Spacer(1, block.height)
+        if isinstance(block, ImageBlock):
+            return self.image(block)
+        if isinstance(block, ImageRow):
+            return self.image_row(block)
+        if isinstance(block, TableBlock):
+            return self.table(block, content_width)
+        if isinstance(block, LinkBlock):
+            return IconLink(str(self.images.get(block.icon, ICON_SIZE)), block.text, block.url, block.width)
+        if isinstance(block, PdfPageBlock):
+            return PDFPageFlowable(block.path, block.width, lazy=self.lazy, forms=self.pdf_forms)
+        raise TypeError(f"Unsupported content block: {block!r}")
+
+    def section(self, section: Section, content_width: float) -> List[Flowable]:
+        flowables = []
+        if section.title:
+            flowables.append(Paragraph(section.title, self.heading_style))
+        flowables.extend(self.block(block, content_width) for block in section.blocks)
+        if section.keep_together and self.lazy:
+            # KeepTogether measures the whole group before drawing any of it. When streaming,
+            # only the heading and the spacing under it are kept with the first block.
+            for flowable in flowables[:-1]:
+                if flowable is not flowables[0] and not isinstance(flowable, Spacer):
+                    break
+                flowable.keepWithNext = True
+        elif section.keep_together:
+            flowables = [KeepTogether(flowables)]
+        if section.page_break_before:
+            flowables.insert(0, PageBreak())
+        return flowables
+
+
+def iter_story(document: Document, content_width: float, images: ImageDerivatives,
+               lazy: bool = False) -> Iterator[Flowable]:
+    renderer = PdfRenderer(images, lazy)
+    for section in document.sections:
+        yield from renderer.section(section, content_width)
+
+
+def render_story(document: Document, content_width: float, images: ImageDerivatives):
+    return list(iter_story(document, content_width, images))
+
+
+def stream_story(document: Document, content_width: float, images: ImageDerivatives) -> StreamingStory:
+    return StreamingStory(iter_story(document, content_width, images, lazy=True))
@@ -1,90 +1,75 @@
 from __future__ import annotations
 
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.platypus import KeepTogether, PageBreak, Paragraph, Spacer, Table
+from typing import Iterator
 
-from styles import create_heading_style, create_table_style, create_normal_style
+from content_model import Section, Spacer, TableBlock
+from utils import load_link_characterization
 
-CONTENT_MARGIN = 18 * mm
+SPEC_COLUMN_FRACTIONS = (0.3, 0.7)
 
 
-def _content_width() -> float:
-    page_width, _ = A4
-    return page_width - 2 * CONTENT_MARGIN
+def _format_baudrate(baudrate: int) -> str:
+    if baudrate >= 1000000 and baudrate % 1000000 == 0:
+        return f'{baudrate // 1000000} Mbps'
+    if baudrate >= 1000:
+        return f'{baudrate / 1000:g} kbps'
+    return f'{baudrate} bps'
 
 
-def _simple_table(data):
-    widths = [_content_width() * 0.3, _content_width() * 0.7]
-    table = Table(data, colWidths=widths, hAlign='LEFT')
-    table.setStyle(create_table_style())
-    return table
+def _baud_rate_text(results) -> str:
+    if not results:
+        return 'Up to 1 Mbps is tested and supported'
+    if not results.get('max_error_free_baudrate'):
+        return 'Loopback characterization failed at every tested baud rate'
+    return f"Up to {_format_baudrate(results['max_error_free_baudrate'])} is tested and supported"
 
 
-def add_electrical_specs(story, normal_style):
-    heading = create_heading_style()
-    normal = create_normal_style()
-    story.append(PageBreak())
-    elements = [
-        Paragraph('Electrical Specifications', heading),
-        Spacer(1, 4)
-    ]
+def _current_draw_text(results) -> str:
+    if not results or results.get('typical_current_ma') is None:
+        return 'To be determined'
+    return f"{results['typical_current_ma']:g} mA"
 
-    data = [
+
+def _spec_section(title: str, rows, page_break_before: bool = False) -> Section:
+    return Section(
+        title,
+        [Spacer(4), TableBlock(rows, SPEC_COLUMN_FRACTIONS), Spacer(8)],
+        page_break_before=page_break_before,
+        keep_together=True,
+    )
+
+
+def electrical_specs_section() -> Section:
+    results = load_link_characterization()
+    return _spec_section('Electrical Specifications', [
         ['Parameter', 'Specification'],
-        ['Supply Voltage', Paragraph('5V nominal when powered via USB (up to 6V max) or can be powered with 3.3V or 5V from your project\'s power supply rail.', normal)],
-        ['Typical Current Draw', Paragraph('To be determined', normal)],
-        ['Supported Baud Rates', Paragraph('Up to 1 Mbps is tested and supported', normal)],
-        ['ESD Protection', Paragraph('±8 kV (air or contact) on USB and headers. Components on the PCB are not protected, so use ESD straps or place the board into an enclosure.', normal)],
-    ]
-
-    elements.append(_simple_table(data))
-    elements.append(Spacer(1, 8))
-    story.append(KeepTogether(elements))
-
-
-def add_interface_specs(story, normal_style):
-    heading = create_heading_style()
-    normal = create_normal_style()
-    elements = [
-        Paragraph('Interface & Connectivity', heading),
-        Spacer(1, 4)
-    ]
-
-    data = [
-        ['Connector', 'Details'],
-        ['Bus Terminals', Paragraph('Two sets of A, B, GND on a 2.54 mm header for field wiring', normal)],
-        ['Host Interface', Paragraph('USB, Raspberry Pi header stacking, and jumper wire area (GND/TX/RX) for boards like Arduino or ESP32', normal)],
-        ['Status Indicators', Paragraph('Power LED (yellow), transmit LED (red) and receive LED (green)', normal)],
-    ]
+        ['Supply Voltage', '5V nominal when powered via USB (up to 6V max) or can be powered with 3.3V or 5V from your project\'s power supply rail.'],
+        ['Typical Current Draw', _current_draw_text(results)],
+        ['Supported Baud Rates', _baud_rate_text(results)],
+        ['ESD Protection', '±8 kV (air or contact) on USB and headers. Components on the PCB are not protected, so use ESD straps or place the board into an enclosure.'],
+    ], page_break_before=True)
 
-    elements.append(_simple_table(data))
-    elements.append(Spacer(1, 8))
-    story.append(KeepTogether(elements))
 
+def interface_specs_section() -> Section:
+    return _spec_section('Interface & Connectivity', [
+        ['Connector', 'Details'],
+        ['Bus Terminals', 'Two sets of A, B, GND on a 2.54 mm header for field wiring'],
+        ['Host Interface', 'USB, Raspberry Pi header stacking, and jumper wire area (GND/TX/RX) for boards like Arduino or ESP32'],
+        ['Status Indicators', 'Power LED (yellow), transmit LED (red) and receive LED (green)'],
+    ])
 
-def add_mechanical_specs(story, normal_style):
-    heading = create_heading_style()
-    normal = create_normal_style()
-    elements = [
-        Paragraph('Mechanical Details', heading),
-        Spacer(1, 4)
-    ]
 
-    data = [
+def mechanical_specs_section() -> Section:
+    return _spec_section('Mechanical Details', [
         ['Parameter', 'Value'],
-        ['Physical Dimensions', Paragraph('46.2 mm x 30.9 mm. Thickness at thickest point is 11 mm.', normal)],
-        ['PCB Thickness', Paragraph('1.6 mm.', normal)],
-        ['Weight', Paragraph('To be determined', normal)],
-        ['Environmental Rating', Paragraph('0 °C to 60 °C, non-condensing', normal)],
-    ]
-
-    elements.append(_simple_table(data))
-    elements.append(Spacer(1, 8))
-    story.append(KeepTogether(elements))
+        ['Physical Dimensions', '46.2 mm x 30.9 mm. Thickness at thickest point is 11 mm.'],
+        ['PCB Thickness', '1.6 mm.'],
+        ['Weight', 'To be determined'],
+        ['Environmental Rating', '0 °C to 60 °C, non-condensing'],
+    ])
 
 
-def add_all_specs(story, normal_style):
-    add_electrical_specs(story, normal_style)
-    add_interface_specs(story, normal_style)
-    add_mechanical_specs(story, normal_style)
+def all_spec_sections() -> Iterator[Section]:
+    yield electrical_specs_section()
+    yield interface_specs_section()
+    yield mechanical_specs_section()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Memory ceiling for the streaming datasheet build.
+
+Lays out a synthetic long document in a fresh process at two lengths. Every section
+is distinct: its own generated photo, a BOM or placement table from PCB/*/production,
+and every few sections a schematic page from PCB/*/schematic. The streamed build must
+stay under a fixed peak RSS, and that peak must barely move when the document, and
+its output, grow several times over. Runs under pytest or directly:
+
+    python test_streaming_memory.py
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Iterator
+
+from PIL import Image as PILImage
+from pypdf import PdfReader
+from reportlab.platypus import Paragraph
+
+from content_model import Document, ImageBlock, PdfPageBlock, Section, Spacer, TableBlock, Text
+from generate_datasheet import _create_doc_template, peak_rss_mb
+from image_derivatives import ImageDerivatives
+from pdf_backend import STREAM_BATCH_PAGES, StreamingStory, stream_story
+from utils import PCB_ROOT
+
+SHORT_SECTIONS = 60
+LONG_SECTIONS = 180
+SCHEMATIC_EVERY = 5
+PHOTO_SIZE = (400, 300)
+PHOTO_WIDTH = 144  # points; at 200 dpi the generated photo is used without resizing
+MAX_PEAK_RSS_MB = 100
+# Tripling the document adds over 20 MB of output; the peak may only move by this much.
+GROWTH_ALLOWANCE_MB = 15
+
+
+def _read_table(path: Path):
+    with path.open(encoding='utf-8-sig', newline='') as handle:
+        return [row for row in csv.reader(handle) if row]
+
+
+def _photo(directory: Path, index: int) -> Path:
+    """A photo-sized JPEG of noise, different for every section so nothing is shared."""
+    path = directory / f'photo_{index:05d}.jpg'
+    pixels = random.Random(index).randbytes(PHOTO_SIZE[0] * PHOTO_SIZE[1] * 3)
+    PILImage.frombytes('RGB', PHOTO_SIZE, pixels).save(path, quality=85)
+    return path
+
+
+def long_sections(count: int, photo_dir: Path) -> Iterator[Section]:
+    tables = [_read_table(path) for path in sorted(PCB_ROOT.glob('*/production/*.csv'))]
+    tables = [rows for rows in tables if len(rows[0]) > 1]
+    schematics = sorted(PCB_ROOT.glob('*/schematic/*.pdf'))
+    for index in range(count):
+        rows = tables[index % len(tables)]
+        blocks = [
+            Text(f'Assembly record {index}: placement and parts for build lot {index * 7919 % 10007}.'),
+            Spacer(4),
+            ImageBlock(_photo(photo_dir, index), PHOTO_WIDTH),
+            Spacer(4),
+            TableBlock(rows, [1 / len(rows[0])] * len(rows[0])),
+        ]
+        if index % SCHEMATIC_EVERY == 0:
+            blocks.append(PdfPageBlock(schematics[index // SCHEMATIC_EVERY % len(schematics)], PHOTO_WIDTH * 3))
+        yield Section(f'Lot {index}', blocks, page_break_before=index % SCHEMATIC_EVERY == 0)
+
+
+def build_long_document(sections: int, output: Path) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        document = Document('Streaming memory check', long_sections(sections, Path(directory)))
+        doc = _create_doc_template(str(output), streaming=True)
+        doc.build(stream_story(document, doc.width, ImageDerivatives(Path(directory) / 'derivatives')))
+    return {
+        'sections': sections,
+        'peak_rss_mb': peak_rss_mb(),
+        'output_mb': output.stat().st_size / (1024 * 1024),
+        'pages': len(PdfReader(output).pages),
+    }
+
+
+def measure(sections: int) -> dict:
+    """Build in a fresh process so that ru_maxrss belongs to this build alone."""
+    with tempfile.TemporaryDirectory() as directory:
+        output = Path(directory) / 'long.pdf'
+        completed = subprocess.run(
+            [sys.executable, __file__, '--sections', str(sections), '--output', str(output)],
+            cwd=Path(__file__).resolve().parent, capture_output=True, text=True, check=True,
+        )
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def check_memory_ceiling() -> str:
+    short, long = measure(SHORT_SECTIONS), measure(LONG_SECTIONS)
+    # Both lengths span many batches, so the joined output is exercised too.
+    assert short['pages'] > 2 * STREAM_BATCH_PAGES and long['pages'] > short['pages']
+    if long['peak_rss_mb'] is None:
+        return 'peak resident memory is not available on this platform'
+    report = (f"{SHORT_SECTIONS} sections: {short['peak_rss_mb']:.0f} MB peak, {short['output_mb']:.1f} MB PDF, "
+              f"{short['pages']} pages; {LONG_SECTIONS} sections: {long['peak_rss_mb']:.0f} MB peak, "
+              f"{long['output_mb']:.1f} MB PDF, {long['pages']} pages")
+    assert long['peak_rss_mb'] <= MAX_PEAK_RSS_MB, f"peak RSS above {MAX_PEAK_RSS_MB} MB ({report})"
+    assert long['peak_rss_mb'] - short['peak_rss_mb'] <= GROWTH_ALLOWANCE_MB, \
+        f"peak RSS grows with the document ({report})"
+    return report
+
+
+def test_streaming_memory_ceiling():
+    check_memory_ceiling()
+
+
+def test_keep_with_next_chain_is_read_to_its_end():
+    # ReportLab decides where a keepWithNext chain ends from the flowables it can see.
+    flowables = [Paragraph(f'heading {index}') for index in range(30)]
+    for flowable in flowables[:20]:
+        flowable.keepWithNext = True
+    story = StreamingStory(iter(flowables), lookahead=4)
+    assert len(story) == 21
+    del story[:21]
+    assert len(story) == 4
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the peak memory of a streamed long datasheet.')
+    parser.add_argument('--sections', type=int, help='build one document of this many sections and print its measurements')
+    parser.add_argument('--output', type=Path)
+    args = parser.parse_args()
+    if args.sections is not None:
+        print(json.dumps(build_long_document(args.sections, args.output)))
+        return
+    print(check_memory_ceiling())
+
+
+if __name__ == '__main__':
+    main()
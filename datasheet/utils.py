@@ -3,13 +3,14 @@ from __future__ import annotations
 import json
 import re
 from pathlib import Path
-from typing import List, Sequence, Tuple
+from typing import List, MutableMapping, Optional, Sequence, Tuple
 
+import yaml
 from PIL import Image as PILImage
 from pdfrw import PdfReader
 from pdfrw.buildxobj import pagexobj
 from pdfrw.toreportlab import makerl
-from reportlab.platypus import Flowable, Image, Table, TableStyle
+from reportlab.platypus import Flowable, Table, TableStyle
 
 from styles import PRIMARY_COLOR
 
@@ -24,34 +25,58 @@ ADAPTER_PHOTO_PATHS = [
 VERSION_PATTERN = re.compile(r'^\d+\.\d+(?:\.\d+)*$')
 SCHEMATIC_SUBDIR = 'schematic'
 SCHEMATIC_SUFFIX = '-index-schTop.pdf'
+LINK_CHARACTERIZATION_PATH = ASSET_ROOT / 'link_characterization.json'
+PRODUCT_DATA_PATH = PROJECT_DIR.parent / 'PRODUCT_DATA.yaml'
 
 
 class PDFPageFlowable(Flowable):
-    """Embed a PDF page (vector) into the ReportLab story using pdfrw."""
-    def __init__(self, pdf_path: Path, target_width: float):
+    """Embed a PDF page (vector) into the ReportLab story using pdfrw.
+
+    With ``lazy`` the parsed page is dropped once its size is known and parsed
+    again only while it is drawn, so long stories do not hold every page in memory.
+    Flowables that share ``forms``, a mapping from canvas to the pages already
+    embedded on it, draw a page embedded earlier by name instead of embedding it again.
+    """
+    def __init__(self, pdf_path: Path, target_width: float, lazy: bool = False,
+                 forms: Optional[MutableMapping] = None):
         super().__init__()
         self.pdf_path = pdf_path
-        self.xobj = pagexobj(PdfReader(str(pdf_path)).pages[0])
-        bbox = self.xobj.BBox
+        self.lazy = lazy
+        self.forms = forms
+        xobj = self._load()
+        bbox = xobj.BBox
+        self.xobj = None if lazy else xobj
         self.original_width = float(bbox[2]) - float(bbox[0])
         self.original_height = float(bbox[3]) - float(bbox[1])
         self.scale = target_width / self.original_width
         self.target_width = target_width
         self.target_height = self.original_height * self.scale
 
+    def _load(self):
+        return pagexobj(PdfReader(str(self.pdf_path)).pages[0])
+
     def wrap(self, availWidth, availHeight):
         return self.target_width, self.target_height
 
+    def _form_name(self, canvas) -> str:
+        if self.forms is None:
+            return makerl(canvas, self.xobj if self.xobj is not None else self._load())
+        forms = self.forms.setdefault(canvas, {})
+        key = Path(self.pdf_path).resolve()
+        if key not in forms:
+            forms[key] = makerl(canvas, self.xobj if self.xobj is not None else self._load())
+        return forms[key]
+
     def drawOn(self, canvas, x, y, _sW=0):
+        xobj_name = self._form_name(canvas)
         canvas.saveState()
-        xobj_name = makerl(canvas, self.xobj)
         canvas.translate(x, y)
         canvas.scale(self.scale, self.scale)
         canvas.doForm(xobj_name)
         canvas.restoreState()
 
 
-def _fatal(message: str) -> None:
+def fatal(message: str) -> None:
     print(f"ERROR: {message}")
     raise SystemExit(1)
 
@@ -81,19 +106,12 @@ def get_image_size(image_path: Path, target_width: float) -> Tuple[float, float]
     return target_width, height * scale
 
 
-def get_processed_image(image_path: Path, target_width: float) -> Image:
-    width, height = get_image_size(image_path, target_width)
-    img = Image(str(image_path), width=width, height=height)
-    img.hAlign = 'CENTER'
-    return img
-
-
 def get_adapter_photo_paths() -> List[Path]:
     ensure_photo_root()
     missing = [path for path in ADAPTER_PHOTO_PATHS if not path.exists()]
     if missing:
         formatted = '\n  - '.join(str(path) for path in missing)
-        _fatal(
+        fatal(
             "Adapter hero photo(s) missing. Ensure the files exist at the requested absolute paths:\n"
             f"  - {formatted}"
         )
@@ -118,9 +136,9 @@ def create_data_table(data: Sequence[Sequence[str]], col_widths: Sequence[float]
 
 def ensure_photo_root():
     if not ADAPTER_PHOTO_ROOT.exists():
-        _fatal(f"Adapter photo directory missing: {ADAPTER_PHOTO_ROOT}")
+        fatal(f"Adapter photo directory missing: {ADAPTER_PHOTO_ROOT}")
     if not ADAPTER_PHOTO_ROOT.is_dir():
-        _fatal(f"Adapter photo path must be a directory: {ADAPTER_PHOTO_ROOT}")
+        fatal(f"Adapter photo path must be a directory: {ADAPTER_PHOTO_ROOT}")
 
 
 def load_json(path: Path) -> dict:
@@ -128,19 +146,38 @@ def load_json(path: Path) -> dict:
         return json.load(handle)
 
 
+def load_product_data(path: Path = PRODUCT_DATA_PATH) -> List[dict]:
+    if not path.exists():
+        fatal(f"Product data file not found: {path}")
+    with path.open('r', encoding='utf-8') as handle:
+        return yaml.safe_load(handle) or []
+
+
+def load_link_characterization(path: Path = LINK_CHARACTERIZATION_PATH) -> Optional[dict]:
+    """Results written by test_programs/baud_sweep.py, or None if the sweep has not been run
+    against real hardware. Results recorded on a simulated link are never published."""
+    if not path.exists():
+        return None
+    results = load_json(path)
+    if results.get('link') == 'simulated':
+        print(f"WARNING: Ignoring simulated link characterization in {path}")
+        return None
+    return results
+
+
 def parse_version(version: str) -> Tuple[int, ...]:
     return tuple(int(part) for part in version.split('.'))
 
 
 def list_version_directories(base_dir: Path = PCB_ROOT) -> List[Tuple[Tuple[int, ...], str, Path]]:
     if not base_dir.exists():
-        _fatal(f"PCB directory not found: {base_dir}")
+        fatal(f"PCB directory not found: {base_dir}")
     entries: List[Tuple[Tuple[int, ...], str, Path]] = []
     for candidate in base_dir.iterdir():
         if candidate.is_dir() and VERSION_PATTERN.match(candidate.name):
             entries.append((parse_version(candidate.name), candidate.name, candidate))
     if not entries:
-        _fatal(f"No versioned PCB directories found in {base_dir}")
+        fatal(f"No versioned PCB directories found in {base_dir}")
     entries.sort()
     return entries
 
@@ -163,23 +200,21 @@ def get_expected_schematic_path(version_dir: Path, version_str: str) -> Path:
     ]
     if available:
         message_lines.insert(1, f"Available candidates were ignored (version mismatch): {available}")
-    _fatal('\n'.join(message_lines))
+    fatal('\n'.join(message_lines))
     return schematic_path  # Unreachable
 
 
-def get_schematic_flowable(content_width: float) -> Tuple[Flowable, str, Path]:
+def get_schematic_path() -> Tuple[str, Path]:
     version_str, version_dir = find_latest_version_dir()
-    schematic_path = get_expected_schematic_path(version_dir, version_str)
-    flowable = PDFPageFlowable(schematic_path, content_width)
-    return flowable, version_str, schematic_path
+    return version_str, get_expected_schematic_path(version_dir, version_str)
 
 
 def ensure_connection_diagram_available(filename: str = 'connection_diagram.jpg') -> Path:
     path = ASSET_ROOT / filename
     if not path.exists():
-        _fatal(f"Connection diagram missing: {path}. Please create a symlink to the real asset.")
+        fatal(f"Connection diagram missing: {path}. Please create a symlink to the real asset.")
     if path.is_symlink():
         target = path.resolve()
         if target.is_symlink():
-            _fatal(f"Connection diagram symlink must point to a real file, but points to another symlink: {path}")
+            fatal(f"Connection diagram symlink must point to a real file, but points to another symlink: {path}")
     return path
\ No newline at end of file
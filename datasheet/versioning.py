@@ -4,7 +4,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Tuple
 
-from reportlab.platypus import Paragraph, Spacer
+from content_model import Section, Spacer, Text
 
 DATA_DIR = Path(__file__).resolve().parent
 VERSIONS_FILE = DATA_DIR / 'versions.txt'
@@ -29,8 +29,10 @@ def get_latest_version_info() -> Tuple[str, str]:
     return DEFAULT_VERSION[0], datetime.now().strftime('%Y-%m-%d')
 
 
-def add_version_info(story, style):
+def version_info_section() -> Section:
     version, release_date = get_latest_version_info()
-    story.append(Spacer(1, 12))
-    story.append(Paragraph(f"Datasheet Version: {version}   Release Date: {release_date}", style))
-    story.append(Spacer(1, 12))
+    return Section(None, [
+        Spacer(12),
+        Text(f"Datasheet Version: {version}   Release Date: {release_date}"),
+        Spacer(12),
+    ])
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""Sweep baud rates and payload patterns over an RS485 link.
+
+Each step sends a burst of frame_decoder frames, reads them back on the far
+end, and records the frame and byte error rates and the effective payload
+throughput.
+The results are written as JSON to the file the datasheet's electrical
+specification table reads (datasheet/link_characterization.json by default).
+Simulated sweeps go to datasheet/link_characterization_simulated.json instead,
+and the datasheet ignores any results file recorded on a simulated link.
+
+Against hardware, connect two adapters bus to bus (A to A, B to B, GND to
+GND), write on one and read on the other, so that both transceivers and the
+cable are part of the measurement:
+
+    python baud_sweep.py --port /dev/ttyUSB0 --rx-port /dev/ttyUSB1 --current-ma 42
+
+In CI, --simulate runs the same sweep over a pseudo-terminal whose far end
+echoes the bytes with the wire time of the selected baud rate:
+
+    python baud_sweep.py --simulate
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pty
+import random
+import select
+import threading
+import time
+import tty
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import serial
+
+from frame_decoder import FrameFormat, decode, encode_frame
+
+BITS_PER_BYTE = 10  # 8N1
+DEFAULT_BAUDRATES = [9600, 19200, 38400, 57600, 115200, 230400, 460800, 921600, 1000000]
+DEFAULT_PAYLOAD_SIZE = 64
+DEFAULT_STEP_SECONDS = 0.5
+MIN_FRAMES_PER_STEP = 16
+# The echo is read while the burst is written: never more than MAX_IN_FLIGHT bytes are
+# outstanding, which keeps both the adapter's and a pty's 4 KB receive buffer from filling.
+WRITE_CHUNK_SIZE = 512
+MAX_IN_FLIGHT = 4 * WRITE_CHUNK_SIZE
+RESULTS_PATH = Path(__file__).resolve().parent.parent / 'datasheet' / 'link_characterization.json'
+# Simulated sweeps must never end up in the published datasheet.
+SIMULATED_RESULTS_PATH = RESULTS_PATH.with_name('link_characterization_simulated.json')
+
+
+def _pattern_zeros(size: int, index: int, rng: random.Random) -> bytes:
+    return bytes(size)
+
+
+def _pattern_ones(size: int, index: int, rng: random.Random) -> bytes:
+    return b'\xff' * size
+
+
+def _pattern_alternating(size: int, index: int, rng: random.Random) -> bytes:
+    return b'\x55\xaa' * (size // 2) + b'\x55' * (size % 2)
+
+
+def _pattern_walking(size: int, index: int, rng: random.Random) -> bytes:
+    return bytes(1 << ((index + offset) % 8) for offset in range(size))
+
+
+def _pattern_random(size: int, index: int, rng: random.Random) -> bytes:
+    return bytes(rng.getrandbits(8) for _ in range(size))
+
+
+PATTERNS: Dict[str, Callable[[int, int, random.Random], bytes]] = {
+    'zeros': _pattern_zeros,
+    'ones': _pattern_ones,
+    'alternating': _pattern_alternating,
+    'walking': _pattern_walking,
+    'random': _pattern_random,
+}
+
+
+class LoopbackLink:
+    """Far end of a simulated loopback on a pseudo-terminal.
+
+    Bytes written to ``port_name`` come back after the wire time of the current
+    ``baudrate``; ``byte_error_rate`` flips one bit in that fraction of bytes.
+    """
+
+    def __init__(self, baudrate: int = DEFAULT_BAUDRATES[0], byte_error_rate: float = 0.0, seed: int = 0):
+        self.baudrate = baudrate
+        self.byte_error_rate = byte_error_rate
+        self._random = random.Random(seed)
+        self._master_fd, self._slave_fd = pty.openpty()
+        tty.setraw(self._slave_fd)
+        self.port_name = os.ttyname(self._slave_fd)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def __enter__(self) -> 'LoopbackLink':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        os.close(self._master_fd)
+        os.close(self._slave_fd)
+
+    def _corrupt(self, data: bytes) -> bytes:
+        if not self.byte_error_rate:
+            return data
+        corrupted = bytearray(data)
+        for index in range(len(corrupted)):
+            if self._random.random() < self.byte_error_rate:
+                corrupted[index] ^= 1 << self._random.randrange(8)
+        return bytes(corrupted)
+
+    def _serve(self) -> None:
+        wire_free_at = 0.0
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self._master_fd], [], [], 0.05)
+            if not readable:
+                continue
+            data = os.read(self._master_fd, 4096)
+            wire_free_at = max(wire_free_at, time.perf_counter()) + len(data) * BITS_PER_BYTE / self.baudrate
+            wait = wire_free_at - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            os.write(self._master_fd, self._corrupt(data))
+
+
+def _frames_for_step(baudrate: int, frame_size: int, seconds: float) -> int:
+    return max(MIN_FRAMES_PER_STEP, int(baudrate / BITS_PER_BYTE * seconds / frame_size))
+
+
+def _exchange(port, receiver, sent: bytes, idle_timeout: float) -> bytes:
+    """Write ``sent`` on ``port`` and collect it from ``receiver``, keeping at most
+    MAX_IN_FLIGHT bytes unanswered.
+
+    Bytes that do not come back within ``idle_timeout`` are counted as lost, so a link
+    that drops data finishes the step with errors instead of stalling it.
+    """
+    received = bytearray()
+    offset = 0
+    lost = 0
+    receiver.timeout = idle_timeout
+    while True:
+        in_flight = offset - len(received) - lost
+        if offset < len(sent) and in_flight < MAX_IN_FLIGHT:
+            chunk = sent[offset:offset + WRITE_CHUNK_SIZE]
+            port.write(chunk)
+            offset += len(chunk)
+            received += receiver.read(receiver.in_waiting)
+            continue
+        if in_flight <= 0:
+            return bytes(received)
+        data = receiver.read(min(in_flight, max(1, receiver.in_waiting)))
+        if data:
+            received += data
+        elif offset < len(sent):
+            lost += in_flight
+        else:
+            return bytes(received)
+
+
+def compare_frames(frames: List[bytes], received: bytes, fmt: FrameFormat) -> Tuple[int, int, int]:
+    """Line the decoded frames of ``received`` up with the equally sized ``frames`` that
+    were sent, by start offset, so a lost or extra byte only damages the frames around it.
+
+    Returns (intact frames, received frames whose bytes differ from the sent frame, byte
+    errors). Byte errors are the differing bytes between consecutive intact frames, or the
+    whole stretch when bytes were lost or inserted there.
+    """
+    size = len(frames[0])
+    starts, _ = decode(received, fmt)
+    intact = corrupted = 0
+    matched = [(-1, -size)]  # (sent index, received offset) of intact frames
+    index, start = matched[0]
+    for next_start in starts.tolist():
+        index += max(1, round((next_start - start) / size))
+        start = next_start
+        if index >= len(frames):
+            break
+        if received[start:start + size] == frames[index]:
+            intact += 1
+            matched.append((index, start))
+        else:
+            corrupted += 1
+    matched.append((len(frames), len(received)))
+
+    byte_errors = 0
+    for (first, first_start), (last, last_start) in zip(matched, matched[1:]):
+        expected = np.frombuffer(b''.join(frames[first + 1:last]), dtype=np.uint8)
+        actual = np.frombuffer(received[first_start + size:last_start], dtype=np.uint8)
+        if expected.size == actual.size:
+            byte_errors += int(np.count_nonzero(expected != actual))
+        else:
+            byte_errors += max(expected.size, actual.size)
+    return intact, corrupted, byte_errors
+
+
+def run_step(port, baudrate: int, pattern: str, payload_size: int, seconds: float, fmt: FrameFormat, seed: int = 0,
+             rx_port=None) -> dict:
+    """One burst at one baud rate; ``rx_port`` reads it back on a second adapter, else ``port`` does."""
+    rng = random.Random(seed)
+    generate = PATTERNS[pattern]
+    frame_count = _frames_for_step(baudrate, fmt.header_size + payload_size + fmt.trailer_size, seconds)
+    frames = [encode_frame(generate(payload_size, index, rng), fmt) for index in range(frame_count)]
+    sent = b''.join(frames)
+    idle_timeout = MAX_IN_FLIGHT * BITS_PER_BYTE / baudrate + 0.5
+
+    receiver = rx_port if rx_port is not None else port
+    for serial_port in {id(port): port, id(receiver): receiver}.values():
+        serial_port.baudrate = baudrate
+    # A write that cannot finish means the link has stalled; fail the step instead of hanging.
+    port.write_timeout = idle_timeout
+    receiver.reset_input_buffer()
+    started = time.perf_counter()
+    received = _exchange(port, receiver, sent, idle_timeout)
+    elapsed = time.perf_counter() - started
+
+    intact, corrupted, byte_errors = compare_frames(frames, received, fmt)
+    frame_errors = frame_count - intact
+    return {
+        'baudrate': baudrate,
+        'pattern': pattern,
+        'payload_size': payload_size,
+        'frames_sent': frame_count,
+        'frames_received': intact + corrupted,
+        'frames_corrupted': corrupted,
+        'frame_errors': frame_errors,
+        'frame_error_rate': frame_errors / frame_count,
+        'bytes_sent': len(sent),
+        'bytes_received': len(received),
+        'byte_errors': byte_errors,
+        'byte_error_rate': byte_errors / len(sent),
+        'elapsed': elapsed,
+        'throughput_bps': intact * payload_size * 8 / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def max_error_free_baudrate(steps: List[dict]) -> Optional[int]:
+    """Highest baud rate below which every tested rate, for every pattern, came back without
+    a single error. The first failing rate ends the range even if faster rates passed."""
+    failing = {step['baudrate'] for step in steps if step['byte_errors'] or step['frame_errors']}
+    highest = None
+    for baudrate in sorted({step['baudrate'] for step in steps}):
+        if baudrate in failing:
+            break
+        highest = baudrate
+    return highest
+
+
+def sweep(port, baudrates: List[int], patterns: List[str], payload_size: int, seconds: float,
+          link: Optional[LoopbackLink] = None, fmt: FrameFormat = FrameFormat(), rx_port=None) -> List[dict]:
+    steps = []
+    for baudrate in baudrates:
+        if link is not None:
+            link.baudrate = baudrate
+        for pattern in patterns:
+            step = run_step(port, baudrate, pattern, payload_size, seconds, fmt, rx_port=rx_port)
+            print(
+                f"{baudrate:>8} bps  {pattern:<11}  frame errors {step['frame_errors']:>5}/{step['frames_sent']:<6} "
+                f"byte error rate {step['byte_error_rate']:.2e}  throughput {step['throughput_bps'] / 1e3:8.1f} kbit/s"
+            )
+            steps.append(step)
+    return steps
+
+
+def write_results(path: Path, steps: List[dict], link_name: str, typical_current_ma: Optional[float]) -> dict:
+    results = {
+        'generated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'link': link_name,
+        'max_error_free_baudrate': max_error_free_baudrate(steps),
+        'typical_current_ma': typical_current_ma,
+        'steps': steps,
+    }
+    path.write_text(json.dumps(results, indent=2) + '\n', encoding='utf-8')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Characterize an RS485 link across baud rates and payload patterns.')
+    parser.add_argument('--port', help='serial port of the transmitting adapter')
+    parser.add_argument('--rx-port', help='serial port of the receiving adapter, wired A/B/GND to the transmitting one')
+    parser.add_argument('--simulate', action='store_true', help='use a simulated loopback on a pty')
+    parser.add_argument('--baudrates', type=lambda value: [int(item) for item in value.split(',')], default=DEFAULT_BAUDRATES)
+    parser.add_argument('--patterns', type=lambda value: value.split(','), default=list(PATTERNS))
+    parser.add_argument('--payload-size', type=int, default=DEFAULT_PAYLOAD_SIZE)
+    parser.add_argument('--seconds', type=float, default=DEFAULT_STEP_SECONDS, help='approximate wire time per step')
+    parser.add_argument('--simulated-error-rate', type=float, default=0.0, help='fraction of bytes corrupted by the simulated link')
+    parser.add_argument('--current-ma', type=float, default=None, help='typical current draw measured with a meter during the sweep')
+    parser.add_argument('--output', type=Path, default=None,
+                        help=f'results file (default {RESULTS_PATH.name}, or {SIMULATED_RESULTS_PATH.name} with --simulate)')
+    args = parser.parse_args()
+    if not args.simulate and not (args.port and args.rx_port):
+        parser.error('either --port with --rx-port, or --simulate, is required')
+    unknown = [pattern for pattern in args.patterns if pattern not in PATTERNS]
+    if unknown:
+        parser.error(f"unknown pattern(s) {unknown}, choose from {list(PATTERNS)}")
+    if args.output is None:
+        args.output = SIMULATED_RESULTS_PATH if args.simulate else RESULTS_PATH
+
+    with ExitStack() as stack:
+        link = None
+        port_name = args.port
+        if args.simulate:
+            link = stack.enter_context(LoopbackLink(args.baudrates[0], args.simulated_error_rate))
+            port_name = link.port_name
+        port = stack.enter_context(serial.Serial(port_name, baudrate=args.baudrates[0]))
+        rx_port = None if args.simulate else stack.enter_context(serial.Serial(args.rx_port, baudrate=args.baudrates[0]))
+        steps = sweep(port, args.baudrates, args.patterns, args.payload_size, args.seconds, link, rx_port=rx_port)
+
+    link_name = 'simulated' if args.simulate else f'{args.port} -> {args.rx_port}'
+    results = write_results(args.output, steps, link_name, args.current_ma)
+    print(f"Highest error-free baud rate: {results['max_error_free_baudrate']}")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
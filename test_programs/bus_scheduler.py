@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""Drive many devices on one half-duplex RS485 bus without leaving it idle.
+
+Every command is sent as a frame_decoder frame whose payload starts with the
+device address and the command byte; replies use the same layout, which is
+how they are matched to their requests. The scheduler keeps a FIFO queue per
+address, sends all queued commands that need no reply as one back-to-back
+burst, and transmits the next request as soon as a reply has finished and the
+turnaround guard has passed, instead of sleeping a fixed time like 255.py.
+
+``SimulatedBus`` answers for a set of addresses on a pseudo-terminal, so the
+scheduler can be exercised without hardware:
+
+    python bus_scheduler.py --simulate --devices 8 --requests 2000
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import pty
+import random
+import select
+import threading
+import time
+import tty
+from collections import deque
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterable, List, Optional
+
+import serial
+
+from frame_decoder import FrameFormat, FrameReader, encode_frame
+
+DEFAULT_BAUDRATE = 230400
+BITS_PER_BYTE = 10  # 8N1: start bit, eight data bits, stop bit
+DEFAULT_REPLY_TIMEOUT = 0.02
+DEFAULT_RETRIES = 2
+TURNAROUND_CHARACTERS = 2
+NO_REPLY_COMMAND_FLAG = 0x80  # simulated devices stay silent for commands with this bit set
+
+
+def _sleep_until(moment: float) -> None:
+    wait = moment - time.perf_counter()
+    if wait > 0:
+        time.sleep(wait)
+
+
+@dataclass
+class Request:
+    address: int
+    command: int
+    payload: bytes = b''
+    expect_reply: bool = True
+    attempts: int = 0
+    reply: Optional[bytes] = None
+    error: Optional[str] = None
+    latency: Optional[float] = None
+
+    @property
+    def frame_payload(self) -> bytes:
+        return bytes([self.address, self.command]) + self.payload
+
+
+@dataclass
+class BusMetrics:
+    requests: int = 0
+    replies: int = 0
+    timeouts: int = 0
+    retries: int = 0
+    failures: int = 0
+    unmatched_replies: int = 0
+    tx_bytes: int = 0
+    rx_bytes: int = 0
+    busy_time: float = 0.0  # seconds the wire carries data, from byte counts and baud rate
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list, repr=False)
+
+    @property
+    def utilization(self) -> float:
+        return self.busy_time / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.requests} requests in {self.elapsed:.3f} s ({self.requests_per_second:.0f}/s), "
+            f"bus utilization {self.utilization * 100:.1f}%, "
+            f"mean reply latency {self.mean_latency * 1e3:.2f} ms, "
+            f"{self.timeouts} timeouts, {self.retries} retries, {self.failures} failures, "
+            f"{self.unmatched_replies} unmatched replies"
+        )
+
+
+class BusScheduler:
+    def __init__(
+        self,
+        port,
+        baudrate: int = DEFAULT_BAUDRATE,
+        reply_timeout: float = DEFAULT_REPLY_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        turnaround: Optional[float] = None,
+        fmt: FrameFormat = FrameFormat(),
+    ):
+        self.port = port
+        self.baudrate = baudrate
+        self.reply_timeout = reply_timeout
+        self.retries = retries
+        self.character_time = BITS_PER_BYTE / baudrate
+        self.turnaround = turnaround if turnaround is not None else TURNAROUND_CHARACTERS * self.character_time
+        self.fmt = fmt
+        self.metrics = BusMetrics()
+        self._reader = FrameReader(fmt)
+        self._queues: Dict[int, Deque[Request]] = {}
+        self._submitted: List[Request] = []
+        self._bus_free_at = 0.0
+
+    def submit(self, address: int, command: int, payload: bytes = b'', expect_reply: bool = True) -> Request:
+        request = Request(address, command, bytes(payload), expect_reply)
+        self._queues.setdefault(address, deque()).append(request)
+        self._submitted.append(request)
+        return request
+
+    def run(self) -> List[Request]:
+        """Send everything queued so far and return the requests in submission order."""
+        started = time.perf_counter()
+        addresses = itertools.cycle(list(self._queues))
+        while any(self._queues.values()):
+            self._send_burst()
+            for _ in range(len(self._queues)):
+                queue = self._queues[next(addresses)]
+                if queue and queue[0].expect_reply:
+                    self._transact(queue.popleft())
+                    break
+        self._drain()
+        self.metrics.elapsed += time.perf_counter() - started
+        completed, self._submitted = self._submitted, []
+        return completed
+
+    def run_naive(self) -> List[Request]:
+        """Baseline for comparison: like 255.py, write one request and block until its
+        reply arrives or the timeout passes before sending the next; no bursts, no retries."""
+        started = time.perf_counter()
+        for request in self._submitted:
+            sent_at = self._write(request.frame_payload)
+            request.attempts = 1
+            self.metrics.requests += 1
+            if request.expect_reply:
+                reply = self._await_reply(request, sent_at + self.reply_timeout)
+                if reply is None:
+                    request.error = 'timeout'
+                    self.metrics.timeouts += 1
+                    self.metrics.failures += 1
+                else:
+                    request.reply = reply
+                    request.latency = time.perf_counter() - sent_at
+                    self.metrics.replies += 1
+                    self.metrics.latencies.append(request.latency)
+        self._queues.clear()
+        self._drain()
+        self.metrics.elapsed += time.perf_counter() - started
+        completed, self._submitted = self._submitted, []
+        return completed
+
+    def _send_burst(self) -> None:
+        burst = []
+        for queue in self._queues.values():
+            while queue and not queue[0].expect_reply:
+                request = queue.popleft()
+                request.attempts = 1
+                self.metrics.requests += 1
+                burst.append(encode_frame(request.frame_payload, self.fmt))
+        if burst:
+            self._write_frames(b''.join(burst))
+
+    def _transact(self, request: Request) -> None:
+        self.metrics.requests += 1
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.metrics.retries += 1
+                self.port.reset_input_buffer()
+                self._reader.reset()
+            request.attempts += 1
+            sent_at = self._write(request.frame_payload)
+            reply = self._await_reply(request, sent_at + self.reply_timeout)
+            if reply is not None:
+                request.reply = reply
+                request.latency = time.perf_counter() - sent_at
+                self.metrics.replies += 1
+                self.metrics.latencies.append(request.latency)
+                return
+            self.metrics.timeouts += 1
+        request.error = 'timeout'
+        self.metrics.failures += 1
+
+    def _write(self, payload: bytes) -> float:
+        return self._write_frames(encode_frame(payload, self.fmt))
+
+    def _drain(self) -> None:
+        """Wait until the last transmitted byte has left the wire (the OS returns from write much earlier)."""
+        _sleep_until(self._bus_free_at - self.turnaround)
+
+    def _write_frames(self, data: bytes) -> float:
+        _sleep_until(self._bus_free_at)
+        self.port.write(data)
+        wire_time = len(data) * self.character_time
+        self.metrics.tx_bytes += len(data)
+        self.metrics.busy_time += wire_time
+        sent_at = time.perf_counter()
+        self._bus_free_at = sent_at + wire_time + self.turnaround
+        return sent_at
+
+    def _await_reply(self, request: Request, deadline: float) -> Optional[bytes]:
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            self.port.timeout = remaining
+            received = self.port.read(max(1, self.port.in_waiting))
+            if not received:
+                return None
+            self.metrics.rx_bytes += len(received)
+            self.metrics.busy_time += len(received) * self.character_time
+            reply = self._match(request, self._reader.feed(received))
+            if reply is not None:
+                self._bus_free_at = time.perf_counter() + self.turnaround
+                return reply
+
+    def _match(self, request: Request, payloads: Iterable[bytes]) -> Optional[bytes]:
+        reply = None
+        for payload in payloads:
+            if reply is None and payload[:2] == request.frame_payload[:2]:
+                reply = payload[2:]
+            else:
+                self.metrics.unmatched_replies += 1
+        return reply
+
+
+def echo_handler(payload: bytes) -> Optional[bytes]:
+    if len(payload) < 2 or payload[1] & NO_REPLY_COMMAND_FLAG:
+        return None
+    return payload
+
+
+class SimulatedBus:
+    """Devices answering on a pseudo-terminal, with wire time modelled from the baud rate.
+
+    ``port_name`` can be opened with serial.Serial like a real adapter. Each device
+    replies to frames addressed to it with ``handler(payload)``; returning None, or a
+    random draw below ``drop_rate``, leaves the request unanswered. The default
+    handler echoes every command that does not carry NO_REPLY_COMMAND_FLAG.
+    """
+
+    def __init__(
+        self,
+        addresses: Iterable[int],
+        baudrate: int = DEFAULT_BAUDRATE,
+        response_delay: float = 0.0002,
+        drop_rate: float = 0.0,
+        handler: Callable[[bytes], Optional[bytes]] = echo_handler,
+        fmt: FrameFormat = FrameFormat(),
+        seed: int = 0,
+    ):
+        self.addresses = set(addresses)
+        self.character_time = BITS_PER_BYTE / baudrate
+        self.response_delay = response_delay
+        self.drop_rate = drop_rate
+        self.handler = handler
+        self.fmt = fmt
+        self.received: List[bytes] = []
+        self._random = random.Random(seed)
+        self._master_fd, self._slave_fd = pty.openpty()
+        tty.setraw(self._slave_fd)
+        self.port_name = os.ttyname(self._slave_fd)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def __enter__(self) -> 'SimulatedBus':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        os.close(self._master_fd)
+        os.close(self._slave_fd)
+
+    def _serve(self) -> None:
+        reader = FrameReader(self.fmt)
+        wire_free_at = 0.0
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self._master_fd], [], [], 0.05)
+            if not readable:
+                continue
+            data = os.read(self._master_fd, 4096)
+            # The bytes finish arriving one wire time after they were written.
+            wire_free_at = max(wire_free_at, time.perf_counter()) + len(data) * self.character_time
+            for payload in reader.feed(data):
+                self.received.append(payload)
+                if not payload or payload[0] not in self.addresses:
+                    continue
+                response = self.handler(payload)
+                if response is None or self._random.random() < self.drop_rate:
+                    continue
+                reply = encode_frame(response, self.fmt)
+                wire_free_at += self.response_delay
+                _sleep_until(wire_free_at)
+                os.write(self._master_fd, reply)
+                wire_free_at = time.perf_counter() + len(reply) * self.character_time
+
+
+def _queue_workload(scheduler: BusScheduler, addresses: List[int], count: int, no_reply_every: int) -> None:
+    for index in range(count):
+        address = addresses[index % len(addresses)]
+        expect_reply = not no_reply_every or index % no_reply_every != 0
+        command = index & 0x7F if expect_reply else (index & 0x7F) | NO_REPLY_COMMAND_FLAG
+        scheduler.submit(address, command, index.to_bytes(4, 'little'), expect_reply=expect_reply)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Schedule requests to many devices on one RS485 bus.')
+    parser.add_argument('--port', help='serial port of the adapter (omit with --simulate)')
+    parser.add_argument('--simulate', action='store_true', help='run against simulated devices on a pty')
+    parser.add_argument('--baudrate', type=int, default=DEFAULT_BAUDRATE)
+    parser.add_argument('--devices', type=int, default=8, help='addresses 1..N receive requests')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--no-reply-every', type=int, default=4, help='every Nth command expects no reply (0: none)')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_REPLY_TIMEOUT)
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES)
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='simulated probability of a lost reply')
+    parser.add_argument('--naive', action='store_true', help='also run the blocking one-at-a-time baseline')
+    args = parser.parse_args()
+    if not args.simulate and not args.port:
+        parser.error('either --port or --simulate is required')
+
+    addresses = list(range(1, args.devices + 1))
+    modes = [('pipelined', BusScheduler.run)] + ([('naive', BusScheduler.run_naive)] if args.naive else [])
+    with ExitStack() as stack:
+        port_name = args.port
+        if args.simulate:
+            port_name = stack.enter_context(SimulatedBus(addresses, args.baudrate, drop_rate=args.drop_rate)).port_name
+        port = stack.enter_context(serial.Serial(port_name, baudrate=args.baudrate, timeout=args.timeout))
+        for label, run in modes:
+            scheduler = BusScheduler(port, args.baudrate, args.timeout, args.retries)
+            _queue_workload(scheduler, addresses, args.requests, args.no_reply_every)
+            run(scheduler)
+            print(f"{label:>9}: {scheduler.metrics.summary()}")
+            time.sleep(args.timeout)
+            port.reset_input_buffer()
+
+
+if __name__ == '__main__':
+    main()
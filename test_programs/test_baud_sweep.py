@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""baud_sweep over the simulated loopback, and the datasheet's reading of its results.
+
+Runs under pytest or directly:
+
+    python test_baud_sweep.py
+"""
+from __future__ import annotations
+
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+import serial
+
+from baud_sweep import LoopbackLink, compare_frames, max_error_free_baudrate, sweep, write_results
+from frame_decoder import FrameFormat, encode_frame
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'datasheet'))
+from specs import _baud_rate_text  # noqa: E402
+from utils import load_link_characterization  # noqa: E402
+
+BAUDRATES = [115200, 230400]
+PATTERNS = ['zeros', 'random']
+PAYLOAD_SIZE = 32
+STEP_SECONDS = 0.05
+
+
+def _sweep(byte_error_rate: float):
+    with LoopbackLink(BAUDRATES[0], byte_error_rate, seed=3) as link:
+        with serial.Serial(link.port_name, baudrate=BAUDRATES[0]) as port:
+            return sweep(port, BAUDRATES, PATTERNS, PAYLOAD_SIZE, STEP_SECONDS, link)
+
+
+def _frames(count: int, fmt: FrameFormat):
+    rng = random.Random(7)
+    return [encode_frame(bytes(rng.getrandbits(8) for _ in range(PAYLOAD_SIZE)), fmt) for _ in range(count)]
+
+
+def test_clean_link_passes_every_rate():
+    steps = _sweep(0.0)
+    assert len(steps) == len(BAUDRATES) * len(PATTERNS)
+    for step in steps:
+        assert step['frame_errors'] == step['byte_errors'] == step['frames_corrupted'] == 0
+        assert step['frames_received'] == step['frames_sent']
+        assert step['throughput_bps'] > 0
+    assert max_error_free_baudrate(steps) == BAUDRATES[-1]
+
+
+def test_noisy_link_fails_and_reports_a_small_error_rate():
+    byte_error_rate = 0.01
+    steps = _sweep(byte_error_rate)
+    assert max_error_free_baudrate(steps) is None
+    for step in steps:
+        assert step['frame_errors'] > 0
+        # Flipped bits damage single bytes; they must not be counted as a misaligned stream.
+        assert 0 < step['byte_error_rate'] < 5 * byte_error_rate
+
+
+def test_lost_byte_only_damages_its_frame():
+    fmt = FrameFormat()
+    frames = _frames(50, fmt)
+    sent = b''.join(frames)
+    lost = len(frames[0]) * 20 + 10
+    intact, corrupted, byte_errors = compare_frames(frames, sent[:lost] + sent[lost + 1:], fmt)
+    assert intact == len(frames) - 1 and corrupted == 0
+    assert byte_errors == len(frames[0])
+
+    damaged = bytearray(sent)
+    damaged[lost] ^= 0x04
+    intact, corrupted, byte_errors = compare_frames(frames, bytes(damaged), fmt)
+    assert (intact, corrupted, byte_errors) == (len(frames) - 1, 0, 1)
+
+
+def test_frames_with_a_bad_payload_are_counted_as_corrupted():
+    fmt = FrameFormat(checksum='none')
+    frames = _frames(10, fmt)
+    received = bytearray(b''.join(frames))
+    received[len(frames[0]) * 4 + fmt.header_size] ^= 0xFF
+    intact, corrupted, byte_errors = compare_frames(frames, bytes(received), fmt)
+    assert (intact, corrupted, byte_errors) == (len(frames) - 1, 1, 1)
+
+
+def test_datasheet_reads_hardware_results_and_ignores_simulated_ones():
+    steps = _sweep(0.0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'link_characterization.json'
+        write_results(path, steps, '/dev/ttyUSB0 -> /dev/ttyUSB1', 42.0)
+        results = load_link_characterization(path)
+        assert results['max_error_free_baudrate'] == BAUDRATES[-1]
+        assert _baud_rate_text(results) == 'Up to 230.4 kbps is tested and supported'
+
+        write_results(path, steps, 'simulated', None)
+        assert load_link_characterization(path) is None
+        assert _baud_rate_text(load_link_characterization(path)) == 'Up to 1 Mbps is tested and supported'
+
+
+if __name__ == '__main__':
+    test_clean_link_passes_every_rate()
+    test_noisy_link_fails_and_reports_a_small_error_rate()
+    test_lost_byte_only_damages_its_frame()
+    test_frames_with_a_bad_payload_are_counted_as_corrupted()
+    test_datasheet_reads_hardware_results_and_ignores_simulated_ones()
+    print('baud_sweep measures the simulated link as expected.')
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""BusScheduler against SimulatedBus: reply matching, timeouts, retries and ordering.
+
+Runs under pytest or directly:
+
+    python test_bus_scheduler.py
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+
+import serial
+
+from bus_scheduler import NO_REPLY_COMMAND_FLAG, BusScheduler, SimulatedBus
+
+BAUDRATE = 230400
+REPLY_TIMEOUT = 0.05
+SILENT_ADDRESS = 7
+WRONG_COMMAND_ADDRESS = 8
+
+
+def tagged_handler(payload: bytes):
+    """Replies with the request payload plus a marker; misbehaves for two addresses."""
+    address, command = payload[0], payload[1]
+    if command & NO_REPLY_COMMAND_FLAG or address == SILENT_ADDRESS:
+        return None
+    if address == WRONG_COMMAND_ADDRESS:
+        return bytes([address, command ^ 0x01]) + payload[2:]
+    return payload + b'!'
+
+
+@contextmanager
+def scheduler_on_bus(addresses, drop_rate: float = 0.0, retries: int = 2, seed: int = 0):
+    with SimulatedBus(addresses, BAUDRATE, drop_rate=drop_rate, handler=tagged_handler, seed=seed) as bus:
+        with serial.Serial(bus.port_name, baudrate=BAUDRATE, timeout=REPLY_TIMEOUT) as port:
+            yield BusScheduler(port, BAUDRATE, REPLY_TIMEOUT, retries), bus
+
+
+def _submit_mixed(scheduler: BusScheduler, addresses, count: int):
+    requests = []
+    for index in range(count):
+        address = addresses[index % len(addresses)]
+        expect_reply = index % 3 != 0
+        command = index & 0x7F if expect_reply else (index & 0x7F) | NO_REPLY_COMMAND_FLAG
+        requests.append(scheduler.submit(address, command, index.to_bytes(2, 'little'), expect_reply))
+    return requests
+
+
+def test_replies_match_requests_and_order_is_kept_per_address():
+    addresses = [1, 2, 3]
+    with scheduler_on_bus(addresses) as (scheduler, bus):
+        requests = _submit_mixed(scheduler, addresses, 60)
+        assert scheduler.run() == requests
+    for request in requests:
+        if request.expect_reply:
+            assert request.reply == request.payload + b'!'
+            assert request.error is None and request.attempts == 1
+        else:
+            assert request.reply is None and request.attempts == 1
+    metrics = scheduler.metrics
+    assert metrics.requests == len(requests)
+    assert metrics.replies == sum(request.expect_reply for request in requests)
+    assert metrics.timeouts == metrics.retries == metrics.failures == metrics.unmatched_replies == 0
+    # Bursts of no-reply commands must not overtake an earlier command to the same address.
+    for address in addresses:
+        sent = [payload[1] for payload in bus.received if payload[0] == address]
+        assert sent == [request.command for request in requests if request.address == address]
+
+
+def test_dropped_replies_are_retried():
+    addresses = [1, 2, 3, 4]
+    with scheduler_on_bus(addresses, drop_rate=0.3, retries=3, seed=5) as (scheduler, _):
+        requests = [scheduler.submit(address, 0x10, bytes([index])) for index, address in enumerate(addresses * 10)]
+        scheduler.run()
+    metrics = scheduler.metrics
+    assert metrics.retries > 0
+    # Every failed attempt is a timeout; each one is followed by a retry unless the request gave up.
+    assert metrics.timeouts == metrics.retries + metrics.failures
+    for request in requests:
+        if request.error is None:
+            assert request.reply == request.payload + b'!'
+        else:
+            assert request.error == 'timeout' and request.attempts == 4
+    assert metrics.replies + metrics.failures == len(requests)
+
+
+def test_silent_and_mismatched_devices_time_out():
+    addresses = [1, SILENT_ADDRESS, WRONG_COMMAND_ADDRESS]
+    with scheduler_on_bus(addresses, retries=1) as (scheduler, _):
+        good = scheduler.submit(1, 0x20)
+        silent = scheduler.submit(SILENT_ADDRESS, 0x20)
+        mismatched = scheduler.submit(WRONG_COMMAND_ADDRESS, 0x20)
+        scheduler.run()
+    assert good.reply == b'!'
+    for request in (silent, mismatched):
+        assert request.reply is None and request.error == 'timeout' and request.attempts == 2
+    metrics = scheduler.metrics
+    assert metrics.failures == 2 and metrics.timeouts == 4 and metrics.retries == 2
+    # Each attempt to the mismatched device draws a reply with the wrong command byte.
+    assert metrics.unmatched_replies == 2
+
+
+def test_naive_baseline_waits_for_replies_not_the_timeout():
+    addresses = [1, 2]
+    with scheduler_on_bus(addresses) as (scheduler, _):
+        requests = [scheduler.submit(address, 0x30) for address in addresses * 10]
+        scheduler.run_naive()
+    assert all(request.reply == b'!' for request in requests)
+    assert scheduler.metrics.elapsed < len(requests) * REPLY_TIMEOUT / 2
+
+
+if __name__ == '__main__':
+    test_replies_match_requests_and_order_is_kept_per_address()
+    test_dropped_replies_are_retried()
+    test_silent_and_mismatched_devices_time_out()
+    test_naive_baseline_waits_for_replies_not_the_timeout()
+    print('BusScheduler behaves as expected against SimulatedBus.')
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Equivalence fuzz for frame_decoder: the NumPy decoder must match the reference walk.
+
+Runs under pytest or directly:
+
+    python test_frame_decoder.py
+"""
+from __future__ import annotations
+
+import random
+
+import numpy as np
+
+from frame_decoder import (SYNC_ONLY_FORMAT, FrameFormat, FrameReader, decode, decode_chunks, decode_reference,
+                           encode_frame)
+
+FORMATS = [
+    FrameFormat(checksum='sum8'),
+    FrameFormat(checksum='crc8'),
+    FrameFormat(checksum='none'),
+    FrameFormat(checksum='crc8', max_payload=12),
+    FrameFormat(payload_length=5, checksum='sum8'),
+    FrameFormat(payload_length=3, checksum='crc8'),
+    FrameFormat(payload_length=16, max_payload=8, checksum='sum8'),  # max_payload only limits length bytes
+    FrameFormat(sync=0xA5, payload_length=2, checksum='none'),
+    SYNC_ONLY_FORMAT,
+]
+CASES_PER_FORMAT = 150
+
+
+def _random_stream(rng: random.Random, fmt: FrameFormat) -> bytes:
+    """Valid frames mixed with noise, stray sync bytes, corrupted and cut-off frames."""
+    parts = []
+    for _ in range(rng.randint(0, 12)):
+        roll = rng.random()
+        if roll < 0.5:
+            size = fmt.payload_length if fmt.payload_length is not None else rng.randint(0, min(fmt.max_payload, 20))
+            frame = bytearray(encode_frame(bytes(rng.getrandbits(8) for _ in range(size)), fmt))
+            if rng.random() < 0.2:
+                frame[rng.randrange(len(frame))] ^= 1 << rng.randrange(8)
+            if rng.random() < 0.1:
+                frame = frame[:rng.randrange(len(frame))]
+            parts.append(bytes(frame))
+        elif roll < 0.7:
+            parts.append(bytes([fmt.sync]) * rng.randint(1, 3))
+        else:
+            parts.append(bytes(rng.getrandbits(8) for _ in range(rng.randint(1, 8))))
+    return b''.join(parts)
+
+
+def _chunks(data: bytes, rng: random.Random):
+    position = 0
+    while position < len(data):
+        size = rng.randint(1, 8)
+        yield data[position:position + size]
+        position += size
+
+
+def _payload_length(data: bytes, start: int, fmt: FrameFormat) -> int:
+    return fmt.payload_length if fmt.payload_length is not None else data[start + 1]
+
+
+def test_decode_matches_reference():
+    rng = random.Random(1)
+    for fmt in FORMATS:
+        for _ in range(CASES_PER_FORMAT):
+            data = _random_stream(rng, fmt)
+            expected_starts, expected = decode_reference(data, fmt)
+            starts, stats = decode(data, fmt)
+            assert stats == expected, (fmt, data.hex())
+            assert list(starts) == expected_starts, (fmt, data.hex())
+
+
+def test_decode_chunks_matches_reference():
+    rng = random.Random(2)
+    for fmt in FORMATS:
+        for _ in range(CASES_PER_FORMAT):
+            data = _random_stream(rng, fmt)
+            _, expected = decode_reference(data, fmt)
+            assert decode_chunks(_chunks(data, rng), fmt) == expected, (fmt, data.hex())
+
+
+def test_frame_reader_matches_reference():
+    # A live reader holds back a frame that is still incomplete at the end of what it has
+    # seen, so only the part of the stream it has decided on is compared.
+    rng = random.Random(4)
+    for fmt in FORMATS:
+        for _ in range(CASES_PER_FORMAT):
+            data = _random_stream(rng, fmt)
+            expected_starts, _ = decode_reference(data, fmt)
+            reader = FrameReader(fmt)
+            payloads = [payload for chunk in _chunks(data, rng) for payload in reader.feed(chunk)]
+            decided = len(data) - len(reader.buffer)
+            expected = [
+                data[start + fmt.header_size:start + fmt.header_size + _payload_length(data, start, fmt)]
+                for start in expected_starts if start < decided
+            ]
+            assert len(payloads) == reader.stats.frames == sum(start < decided for start in expected_starts), \
+                (fmt, data.hex())
+            assert payloads == expected, (fmt, data.hex())
+
+
+def test_long_crc_stream_matches_reference():
+    # Longer than one CRC prefix block, so the carry between blocks is exercised.
+    rng = random.Random(3)
+    fmt = FrameFormat(checksum='crc8')
+    frames = [encode_frame(bytes(rng.getrandbits(8) for _ in range(rng.randint(0, 40))), fmt) for _ in range(60000)]
+    data = bytearray(b''.join(frames))
+    for index in rng.sample(range(len(data)), 200):
+        data[index] ^= 0x10
+    data = bytes(data)
+    expected_starts, expected = decode_reference(data, fmt)
+    starts, stats = decode(np.frombuffer(data, dtype=np.uint8), fmt)
+    assert stats == expected
+    assert list(starts) == expected_starts
+
+
+if __name__ == '__main__':
+    test_decode_matches_reference()
+    test_decode_chunks_matches_reference()
+    test_frame_reader_matches_reference()
+    test_long_crc_stream_matches_reference()
+    print('frame_decoder agrees with the reference decoder.')